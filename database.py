@@ -3,10 +3,32 @@ from pymongo import ASCENDING, DESCENDING
 
 MONGO_DETAILS = "mongodb://localhost:27017"  # Replace with your MongoDB URI
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DETAILS)
+# A single client per process, shared by all requests
+client = motor.motor_asyncio.AsyncIOMotorClient(
+    MONGO_DETAILS,
+    maxPoolSize=50,
+    minPoolSize=10,
+    serverSelectionTimeoutMS=3000,
+    compressors="zstd",
+    tz_aware=True,
+)
 database = client.fastapi_db
 
 # Collections
 items_collection = database.get_collection("items_collection")
 clockin_collection = database.get_collection("clockin_collection")
 
+
+async def create_indexes():
+    """
+    Creates the indexes used by the filter endpoints.
+    """
+    await items_collection.create_index([("email", ASCENDING)])
+    await items_collection.create_index([("email", ASCENDING), ("expiry_date", ASCENDING)])
+    await items_collection.create_index([("insert_date", DESCENDING)])
+    await items_collection.create_index([("email", ASCENDING), ("insert_date", DESCENDING)])
+    await clockin_collection.create_index([("insert_datetime", DESCENDING)])
+    await clockin_collection.create_index([("email", ASCENDING), ("insert_datetime", DESCENDING)])
+    await clockin_collection.create_index(
+        [("email", ASCENDING), ("location", ASCENDING), ("insert_datetime", DESCENDING)]
+    )
@@ -1,10 +1,11 @@
-from fastapi import FastAPI, HTTPException, status, Query
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
-from typing import List, Optional
+from fastapi import FastAPI, HTTPException, status, Query, Body
+from fastapi.responses import JSONResponse, ORJSONResponse
+from typing import Any, List, Optional
+import orjson
 from bson import ObjectId
-from datetime import datetime, date
-from pydantic import EmailStr
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from datetime import datetime, date, time, timezone
 from models import (
     Item,
     ItemCreate,
@@ -12,184 +13,317 @@ from models import (
     ClockInRecord,
     ClockInCreate,
     ClockInUpdate,
+    ItemDocument,
+    ClockInDocument,
 )
-from database import items_collection, clockin_collection
+from database import items_collection, clockin_collection, create_indexes
+
+# Upper bound on the number of documents a filter endpoint returns per request
+MAX_FILTER_RESULTS = 1000
+DEFAULT_FILTER_LIMIT = 100
+
+# Upper bound on the number of items accepted by a single bulk insert
+MAX_BULK_ITEMS = 1000
+
+# Fields returned to clients; _id is included by MongoDB by default
+ITEM_PROJECTION = {"name": 1, "email": 1, "item_name": 1, "quantity": 1, "expiry_date": 1, "insert_date": 1}
+CLOCKIN_PROJECTION = {"email": 1, "location": 1, "insert_datetime": 1}
+
+
+class UTCJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that writes UTC datetimes with a "Z" suffix instead of "+00:00".
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+        )
+
 
 app = FastAPI(
     title="FastAPI CRUD Application",
     description="A FastAPI application to perform CRUD operations on Items and User Clock-In Records.",
     version="1.0.0",
+    default_response_class=UTCJSONResponse,
 )
 
 
+def parse_object_id(id: str) -> ObjectId:
+    """
+    Parses a path ID into an ObjectId, raising a 400 error if it is malformed.
+    """
+    try:
+        return ObjectId(id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+
+def utc_now() -> datetime:
+    """
+    Returns the current UTC time truncated to milliseconds, the precision BSON stores.
+    """
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def to_bson_date(value: date) -> datetime:
+    """
+    Converts a date into a midnight datetime, since BSON has no native date type.
+    """
+    return datetime.combine(value, time.min)
+
+
+def from_bson_date(value):
+    """
+    Converts a stored midnight datetime back into a date.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def item_helper(item) -> ItemDocument:
+    """
+    Converts a MongoDB item document, read with ITEM_PROJECTION, into the shape of the Item model in place.
+    """
+    item["_id"] = str(item["_id"])
+    item["expiry_date"] = from_bson_date(item["expiry_date"])
+    return item
+
+
+def clockin_helper(record) -> ClockInDocument:
+    """
+    Converts a MongoDB clock-in document, read with CLOCKIN_PROJECTION, into the shape of the ClockInRecord model in place.
+    """
+    record["_id"] = str(record["_id"])
+    return record
+
+
+@app.on_event("startup")
+async def startup_db_indexes():
+    await create_indexes()
+
+
 # -------------------- Items API --------------------
 
-@app.post("/items", response_description="Create a new item", response_model=Item, status_code=status.HTTP_201_CREATED)
+@app.post("/items", response_description="Create a new item", responses={201: {"model": Item}}, status_code=status.HTTP_201_CREATED)
 async def create_item(item: ItemCreate):
     """
     Creates a new item in the database.
     """
-    item = jsonable_encoder(item)
-    item["insert_date"] = datetime.utcnow()
+    item = item.model_dump()
+    item["expiry_date"] = to_bson_date(item["expiry_date"])
+    item["insert_date"] = utc_now()
     new_item = await items_collection.insert_one(item)
-    created_item = await items_collection.find_one({"_id": new_item.inserted_id})
-    if created_item:
-        return Item(**created_item)  
+    if new_item.inserted_id:
+        item["_id"] = new_item.inserted_id
+        return UTCJSONResponse(item_helper(item), status_code=status.HTTP_201_CREATED)
     raise HTTPException(status_code=500, detail="Item creation failed")
 
 
-@app.get("/items/{id}", response_description="Get a single item by ID", response_model=Item)
-async def get_item(id: str):
+@app.post("/items/bulk", response_description="Create multiple items", status_code=status.HTTP_201_CREATED)
+async def create_items_bulk(items: List[ItemCreate] = Body(..., max_length=MAX_BULK_ITEMS)):
     """
-    Retrieves an item by its ID.
+    Creates multiple items in a single database call.
     """
-    if not ObjectId.is_valid(id):
-        raise HTTPException(status_code=400, detail="Invalid ID format")
-    item = await items_collection.find_one({"_id": ObjectId(id)})
-    if item:
-        return Item(**item) 
-    raise HTTPException(status_code=404, detail="Item not found")
+    if not items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    now = utc_now()
+    docs = []
+    for item in items:
+        doc = item.model_dump()
+        doc["expiry_date"] = to_bson_date(doc["expiry_date"])
+        doc["insert_date"] = now
+        docs.append(doc)
+    result = await items_collection.insert_many(docs, ordered=False)
+    return {"inserted_ids": [str(inserted_id) for inserted_id in result.inserted_ids]}
 
-@app.get("/items/filter", response_description="List items with optional filters", response_model=List[Item])
+
+@app.get("/items/filter", response_description="List items with optional filters", responses={200: {"model": List[Item]}})
 async def filter_items(
-    email: Optional[EmailStr] = Query(None, description="Filter by exact email"),
+    email: Optional[str] = Query(None, max_length=254, description="Filter by exact email"),
     expiry_date: Optional[date] = Query(None, description="Filter items expiring after this date (YYYY-MM-DD)"),
     insert_date: Optional[datetime] = Query(None, description="Filter items inserted after this datetime (ISO format)"),
     quantity: Optional[int] = Query(None, ge=0, description="Filter items with quantity >= this number"),
+    skip: int = Query(0, ge=0, description="Number of items to skip"),
+    limit: int = Query(DEFAULT_FILTER_LIMIT, ge=1, le=MAX_FILTER_RESULTS, description="Maximum number of items to return"),
 ):
     """
     Filters items based on query parameters.
     """
-    query = {}
-    if email:
-        query["email"] = email
-    if expiry_date:
-        query["expiry_date"] = {"$gt": expiry_date}
-    if insert_date:
-        query["insert_date"] = {"$gt": insert_date}
-    if quantity is not None:
-        query["quantity"] = {"$gte": quantity}
-    
-    items = []
-    async for item in items_collection.find(query):
-        items.append(Item(**item))  
-    return items
+    query = {
+        key: value
+        for key, value in (
+            ("email", email or None),
+            ("expiry_date", {"$gt": to_bson_date(expiry_date)} if expiry_date else None),
+            ("insert_date", {"$gt": insert_date} if insert_date else None),
+            ("quantity", {"$gte": quantity} if quantity is not None else None),
+        )
+        if value is not None
+    }
+
+    docs = await (
+        items_collection.find(query, ITEM_PROJECTION)
+        .sort("insert_date", DESCENDING)
+        .skip(skip)
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    return UTCJSONResponse([item_helper(item) for item in docs])
 
+@app.get("/items/aggregate", response_description="Count items per email")
+async def aggregate_items(
+    email: Optional[str] = Query(None, max_length=254, description="Restrict the aggregation to this email"),
+    limit: int = Query(DEFAULT_FILTER_LIMIT, ge=1, le=MAX_FILTER_RESULTS, description="Maximum number of emails to return"),
+):
+    """
+    Returns the number of items stored for each email, largest counts first.
+    """
+    match = {"email": email} if email else {"email": {"$exists": True, "$ne": None}}
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$email", "count": {"$sum": 1}}},
+        {"$sort": {"count": DESCENDING, "_id": ASCENDING}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "email": "$_id", "count": 1}},
+    ]
+    cursor = items_collection.aggregate(pipeline, allowDiskUse=True, hint=[("email", ASCENDING)])
+    return UTCJSONResponse(await cursor.to_list(length=limit))
 
+@app.get("/items/{id}", response_description="Get a single item by ID", responses={200: {"model": Item}})
+async def get_item(id: str):
+    """
+    Retrieves an item by its ID.
+    """
+    oid = parse_object_id(id)
+    item = await items_collection.find_one({"_id": oid}, ITEM_PROJECTION)
+    if item:
+        return UTCJSONResponse(item_helper(item))
+    raise HTTPException(status_code=404, detail="Item not found")
 
 @app.delete("/items/{id}", response_description="Delete an item", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_item(id: str):
     """
     Deletes an item by its ID.
     """
-    if not ObjectId.is_valid(id):
-        raise HTTPException(status_code=400, detail="Invalid ID format")
-    result = await items_collection.delete_one({"_id": ObjectId(id)})
+    oid = parse_object_id(id)
+    result = await items_collection.delete_one({"_id": oid})
     if result.deleted_count == 1:
         return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content={})
     raise HTTPException(status_code=404, detail="Item not found")
 
-@app.put("/items/{id}", response_description="Update an item", response_model=Item)
+@app.put("/items/{id}", response_description="Update an item", responses={200: {"model": Item}})
 async def update_item(id: str, item: ItemUpdate):
     """
     Updates an item's details by ID (excluding the insert_date).
     """
-    if not ObjectId.is_valid(id):
-        raise HTTPException(status_code=400, detail="Invalid ID format")
-    item_data = {k: v for k, v in item.dict().items() if v is not None}
+    oid = parse_object_id(id)
+    item_data = item.model_dump(exclude_none=True)
     if "insert_date" in item_data:
         del item_data["insert_date"]  
+    if "expiry_date" in item_data:
+        item_data["expiry_date"] = to_bson_date(item_data["expiry_date"])
     if item_data:
-        update_result = await items_collection.update_one({"_id": ObjectId(id)}, {"$set": item_data})
-        if update_result.modified_count == 1:
-            updated_item = await items_collection.find_one({"_id": ObjectId(id)})
-            if updated_item:
-                return Item(**updated_item)  
-    existing_item = await items_collection.find_one({"_id": ObjectId(id)})
-    if existing_item:
-        return Item(**existing_item)  
+        updated_item = await items_collection.find_one_and_update(
+            {"_id": oid},
+            {"$set": item_data},
+            projection=ITEM_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+    else:
+        updated_item = await items_collection.find_one({"_id": oid}, ITEM_PROJECTION)
+    if updated_item:
+        return UTCJSONResponse(item_helper(updated_item))
     raise HTTPException(status_code=404, detail="Item not found")
 
 # -------------------- Clock-In Records API --------------------
 
-@app.post("/clock-in", response_description="Create a new clock-in record", response_model=ClockInRecord, status_code=status.HTTP_201_CREATED)
+@app.post("/clock-in", response_description="Create a new clock-in record", responses={201: {"model": ClockInRecord}}, status_code=status.HTTP_201_CREATED)
 async def create_clockin(record: ClockInCreate):
     """
     Creates a new clock-in record in the database.
     """
-    record = jsonable_encoder(record)
-    record["insert_datetime"] = datetime.utcnow()
+    record = record.model_dump()
+    record["insert_datetime"] = utc_now()
     new_record = await clockin_collection.insert_one(record)
-    created_record = await clockin_collection.find_one({"_id": new_record.inserted_id})
-    if created_record:
-        return ClockInRecord(**created_record)  
+    if new_record.inserted_id:
+        record["_id"] = new_record.inserted_id
+        return UTCJSONResponse(clockin_helper(record), status_code=status.HTTP_201_CREATED)
     raise HTTPException(status_code=500, detail="Clock-In record creation failed")
 
-@app.get("/clock-in/{id}", response_description="Get a clock-in record by ID", response_model=ClockInRecord)
-async def get_clockin(id: str):
-    """
-    Retrieves a clock-in record by its ID.
-    """
-    if not ObjectId.is_valid(id):
-        raise HTTPException(status_code=400, detail="Invalid ID format")
-    record = await clockin_collection.find_one({"_id": ObjectId(id)})
-    if record:
-        return ClockInRecord(**record)  
-    raise HTTPException(status_code=404, detail="Clock-In record not found")
-
-@app.get("/clock-in/filter", response_description="Filter clock-in records", response_model=List[ClockInRecord])
+@app.get("/clock-in/filter", response_description="Filter clock-in records", responses={200: {"model": List[ClockInRecord]}})
 async def filter_clockins(
-    email: Optional[EmailStr] = Query(None, description="Filter by exact email"),
+    email: Optional[str] = Query(None, max_length=254, description="Filter by exact email"),
     location: Optional[str] = Query(None, description="Filter by exact location"),
     insert_datetime: Optional[datetime] = Query(None, description="Filter clock-ins after this datetime (ISO format)"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(DEFAULT_FILTER_LIMIT, ge=1, le=MAX_FILTER_RESULTS, description="Maximum number of records to return"),
 ):
     """
     Filters clock-in records based on query parameters.
     """
-    query = {}
-    if email:
-        query["email"] = email
-    if location:
-        query["location"] = location
-    if insert_datetime:
-        query["insert_datetime"] = {"$gt": insert_datetime}
-    
-    records = []
-    async for record in clockin_collection.find(query):
-        records.append(ClockInRecord(**record))  
-    return records
+    query = {
+        key: value
+        for key, value in (
+            ("email", email or None),
+            ("location", location or None),
+            ("insert_datetime", {"$gt": insert_datetime} if insert_datetime else None),
+        )
+        if value is not None
+    }
+
+    docs = await (
+        clockin_collection.find(query, CLOCKIN_PROJECTION)
+        .sort("insert_datetime", DESCENDING)
+        .skip(skip)
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    return UTCJSONResponse([clockin_helper(record) for record in docs])
+
+@app.get("/clock-in/{id}", response_description="Get a clock-in record by ID", responses={200: {"model": ClockInRecord}})
+async def get_clockin(id: str):
+    """
+    Retrieves a clock-in record by its ID.
+    """
+    oid = parse_object_id(id)
+    record = await clockin_collection.find_one({"_id": oid}, CLOCKIN_PROJECTION)
+    if record:
+        return UTCJSONResponse(clockin_helper(record))
+    raise HTTPException(status_code=404, detail="Clock-In record not found")
 
 @app.delete("/clock-in/{id}", response_description="Delete a clock-in record", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_clockin(id: str):
     """
     Deletes a clock-in record by its ID.
     """
-    if not ObjectId.is_valid(id):
-        raise HTTPException(status_code=400, detail="Invalid ID format")
-    result = await clockin_collection.delete_one({"_id": ObjectId(id)})
+    oid = parse_object_id(id)
+    result = await clockin_collection.delete_one({"_id": oid})
     if result.deleted_count == 1:
         return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content={})
     raise HTTPException(status_code=404, detail="Clock-In record not found")
 
-@app.put("/clock-in/{id}", response_description="Update a clock-in record", response_model=ClockInRecord)
+@app.put("/clock-in/{id}", response_description="Update a clock-in record", responses={200: {"model": ClockInRecord}})
 async def update_clockin(id: str, record: ClockInUpdate):
     """
     Updates a clock-in record by ID (excluding insert_datetime).
     """
-    if not ObjectId.is_valid(id):
-        raise HTTPException(status_code=400, detail="Invalid ID format")
-    record_data = {k: v for k, v in record.dict().items() if v is not None}
+    oid = parse_object_id(id)
+    record_data = record.model_dump(exclude_none=True)
     if "insert_datetime" in record_data:
         del record_data["insert_datetime"]  
     if record_data:
-        update_result = await clockin_collection.update_one({"_id": ObjectId(id)}, {"$set": record_data})
-        if update_result.modified_count == 1:
-            updated_record = await clockin_collection.find_one({"_id": ObjectId(id)})
-            if updated_record:
-                return ClockInRecord(**updated_record)  
-    existing_record = await clockin_collection.find_one({"_id": ObjectId(id)})
-    if existing_record:
-        return ClockInRecord(**existing_record)  
+        updated_record = await clockin_collection.find_one_and_update(
+            {"_id": oid},
+            {"$set": record_data},
+            projection=CLOCKIN_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+    else:
+        updated_record = await clockin_collection.find_one({"_id": oid}, CLOCKIN_PROJECTION)
+    if updated_record:
+        return UTCJSONResponse(clockin_helper(updated_record))
     raise HTTPException(status_code=404, detail="Clock-In record not found")
 
 # -------------------- Root Endpoint --------------------
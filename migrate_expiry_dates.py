@@ -0,0 +1,18 @@
+import asyncio
+
+from database import items_collection
+
+
+async def migrate_expiry_dates():
+    """
+    Converts expiry_date values stored as "YYYY-MM-DD" strings into BSON datetimes.
+    """
+    result = await items_collection.update_many(
+        {"expiry_date": {"$type": "string"}},
+        [{"$set": {"expiry_date": {"$dateFromString": {"dateString": "$expiry_date", "format": "%Y-%m-%d"}}}}],
+    )
+    print(f"Migrated {result.modified_count} items")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_expiry_dates())
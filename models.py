@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional
-from datetime import datetime, date
+from typing import Optional, TypedDict
+from datetime import datetime, date, timezone
 from bson import ObjectId
 
 class ItemBase(BaseModel):
@@ -23,7 +23,7 @@ class ItemUpdate(BaseModel):
 class Item(ItemBase):
 
     id: str = Field(..., alias="_id")
-    insert_date: datetime = Field(default_factory=datetime.utcnow)
+    insert_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     @validator('id', pre=True, always=True)
     def convert_objectid_to_str(cls, v):
@@ -40,6 +40,15 @@ class Item(ItemBase):
             "from_attributes": True,
         }
 
+class ItemDocument(TypedDict):
+    _id: str
+    name: str
+    email: str
+    item_name: str
+    quantity: int
+    expiry_date: date
+    insert_date: datetime
+
 class ClockInBase(BaseModel):
     email: EmailStr = Field(..., example="user@example.com")
     location: str = Field(..., example="New York Office")
@@ -53,7 +62,7 @@ class ClockInUpdate(BaseModel):
 
 class ClockInRecord(ClockInBase):
     id: str = Field(..., alias="_id")
-    insert_datetime: datetime = Field(default_factory=datetime.utcnow)
+    insert_datetime: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     @validator('id', pre=True, always=True)
     def convert_objectid_to_str(cls, v):
@@ -69,3 +78,9 @@ class ClockInRecord(ClockInBase):
             },
             "from_attributes": True,
         }
+
+class ClockInDocument(TypedDict):
+    _id: str
+    email: str
+    location: str
+    insert_datetime: datetime